@@ -12,6 +12,7 @@ import fcntl
 from datetime import datetime
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from metrics import EventLog
 
 
 # === Config ===
@@ -46,6 +47,8 @@ IMAGESIZE = "4928x3264"
 COLORSPACE = "AdobeRGB"
 ISOAUTO = "False"
 
+metrics = EventLog("cheese")
+
 # === Ensure folders exist ===
 if not os.path.exists(MODEL_PATH):
     print(f"❌- Model folder '{MODEL_PATH}' not found.")
@@ -109,26 +112,32 @@ def configure_camera(isPhoto):
 # === Capture photo with retries ===
 def capture_photo(filename, frame=None, retries=3):
     if(IS_WEBCAM):
-        cv2.imwrite(filename, frame)
+        with metrics.span("capture", filename):
+            cv2.imwrite(filename, frame)
         print(f"✅- Photo saved: {filename}")
         return True
 
-    usb_reset()
-    configure_camera(True)
+    with metrics.span("camera_setup", filename):
+        usb_reset()
+        configure_camera(True)
 
     print(f"📸- Capturing high-resolution photo...")
     args = ["gphoto2", "--capture-image-and-download", f"--filename={filename}"] # "--wait-event-and-download=shutterclosed,timeout=3s"
     if(KEEP_RAW): args.append("--keep-raw")
 
+    capture_start = time.perf_counter()
     for attempt in range(1, retries + 1):
+        if attempt > 1: metrics.incr("capture_retries", filename)
         result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         print(f"📸- result:", result)
         if result.returncode == 0:
             print(f"✅- Photo saved: {filename}")
+            metrics.observe("capture", time.perf_counter() - capture_start, filename)
             return True
         else:
             print(f"⚠️- Attempt {attempt} failed: {result.stderr.decode().strip()}")
             time.sleep(1)
+    metrics.observe("capture", time.perf_counter() - capture_start, filename, result="failed")
     print("❌- Failed to capture photo.")
     return False
 
@@ -284,23 +293,28 @@ def run_cheese_listener():
                 # if "result" in result:
                 #     for word in result["result"]:
                 #         if (word["word"] == "cheese" or word["word"] == "she's") and word["conf"] > 0.85:
-                    cap.release()
-                    stop_stream(stream_proc)
                     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
                     filename = os.path.join(PHOTO_DIR, f"cheese_{timestamp}.jpg")
+                    metrics.mark("trigger", filename)
+                    shot_start = time.perf_counter()
 
-                    if "banana" in text: # Give an extra 3s
-                        show_text("- 1 -")
-                        cv2.waitKey(1111)
-                        show_text("- 2 -")
-                        cv2.waitKey(1111)
-                        show_text("- 3 -")
-                        cv2.waitKey(1111)
-
-                    show_text("- READY -")
-                    cv2.waitKey(800)
-                    show_text("- DON'T MOVE -")
-                    cv2.waitKey(1000)
+                    cap.release()
+                    with metrics.span("stream_stop", filename):
+                        stop_stream(stream_proc)
+
+                    with metrics.span("countdown", filename):
+                        if "banana" in text: # Give an extra 3s
+                            show_text("- 1 -")
+                            cv2.waitKey(1111)
+                            show_text("- 2 -")
+                            cv2.waitKey(1111)
+                            show_text("- 3 -")
+                            cv2.waitKey(1111)
+
+                        show_text("- READY -")
+                        cv2.waitKey(800)
+                        show_text("- DON'T MOVE -")
+                        cv2.waitKey(1000)
 
                     capture_thread = threading.Thread(target=capture_photo, args=(filename, frame))
                     capture_thread.start()
@@ -323,21 +337,25 @@ def run_cheese_listener():
                     show_video(img is not None, img)
                     cv2.waitKey(2200)
 
-                    stream_proc = start_stream()
-
-                    # Try reopening the video stream
-                    for i in range(10):
-                        cv2.namedWindow('Camera', cv2.WINDOW_NORMAL)
-                        cv2.setWindowProperty('Camera', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-                        cap = cv2.VideoCapture(WEBCAM_DEVICE if IS_WEBCAM else VIRTUAL_CAM_DEVICE)
-                        if cap.isOpened():
-                            print("✅- Video stream restarted.")
-                            break
+                    with metrics.span("stream_restart", filename):
+                        stream_proc = start_stream()
+
+                        # Try reopening the video stream
+                        for i in range(10):
+                            if i > 0: metrics.incr("stream_reopen_attempts", filename)
+                            cv2.namedWindow('Camera', cv2.WINDOW_NORMAL)
+                            cv2.setWindowProperty('Camera', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+                            cap = cv2.VideoCapture(WEBCAM_DEVICE if IS_WEBCAM else VIRTUAL_CAM_DEVICE)
+                            if cap.isOpened():
+                                print("✅- Video stream restarted.")
+                                break
+                            else:
+                                print(f"⏳- Waiting for video stream to restart... ({i+1}/10)")
+                                time.sleep(1)
                         else:
-                            print(f"⏳- Waiting for video stream to restart... ({i+1}/10)")
-                            time.sleep(1)
-                    else:
-                        print("❌- Failed to restart video stream after photo.")
+                            print("❌- Failed to restart video stream after photo.")
+
+                    metrics.observe("shot", time.perf_counter() - shot_start, filename)
 
             key = cv2.waitKey(1) & 0xFF
             if key == 27 or key == ord('q'):
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+# === Config ===
+METRICS_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.jsonl") # Events from cheese.py and server.py (one JSON per line), read back by `/metrics`
+METRICS_LOG_ENABLED = os.environ.get("CHEESE_METRICS_LOG", "1") == "1" # `CHEESE_METRICS_LOG=0` disables the file (cheese.py stages then never reach `/metrics`)
+METRICS_LOG_MAX_BYTES = 10 * 1024 * 1024 # Past this size server.py moves the log to `metrics.jsonl.1` (previous one is overwritten)
+JSON_LOG = os.environ.get("CHEESE_JSON_LOG", "0") == "1" # `CHEESE_JSON_LOG=1` also prints every event as JSON on stderr
+TRIGGER_TTL = 300 # Seconds a trigger is kept waiting for its `update` emit (failed captures never get one)
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60) # Histogram buckets in seconds
+RESULTS = ("ok", "failed") # `result` label of the histogram
+
+# Stages of a shot, in order (cheese.py then server.py)
+STAGES = {
+    "countdown": "Countdown shown on screen before the capture",
+    "stream_stop": "Stopping the live view stream",
+    "camera_setup": "usb_reset and configure_camera before the capture",
+    "capture": "gphoto2 capture and download, retries included",
+    "stream_restart": "Restarting the live view stream and reopening the video capture",
+    "shot": "Whole shot in cheese.py, from trigger heard to live view back",
+    "thumbnail": "Thumbnail generation in server.py",
+    "emit": "Socket.IO `update` emit in server.py",
+    "end_to_end": "From trigger heard in cheese.py to the `update` emit in server.py",
+}
+
+COUNTERS = {
+    "capture_retries": "gphoto2 capture attempts retried after a failure",
+    "stream_reopen_attempts": "Extra attempts to reopen the video stream after a failed open",
+    "watchdog_events_dropped": "New image events ignored by the watchdog debounce",
+}
+
+
+# === Event log (cheese.py) ===
+# Spans, counters and marks keyed by photo filename, only appended to `METRICS_LOG`
+class EventLog:
+    def __init__(self, source):
+        self.source = source
+
+    def _write(self, event):
+        line = json.dumps(event)
+        if JSON_LOG:
+            print(line, file=sys.stderr) # stderr: start.sh pipes the stdout of server.py into cheese.py
+        if not METRICS_LOG_ENABLED:
+            return
+        try:
+            with open(METRICS_LOG, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"⚠️- Failed to write metrics event: {e}")
+
+    def _event(self, kind, name, photo, **fields):
+        event = {"ts": time.time(), "source": self.source, "type": kind, "name": name,
+                 "photo": os.path.basename(photo) if photo else None}
+        event.update(fields)
+        return event
+
+    def _record(self, event):
+        self._write(event)
+
+    def observe(self, stage, duration, photo=None, result="ok"):
+        self._record(self._event("span", stage, photo, duration=duration, result=result))
+
+    @contextmanager
+    def span(self, stage, photo=None):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - start, photo, result="failed")
+            raise
+        self.observe(stage, time.perf_counter() - start, photo)
+
+    def incr(self, name, photo=None, value=1):
+        self._record(self._event("counter", name, photo, value=value))
+
+    def mark(self, name, photo=None):
+        self._write(self._event("mark", name, photo))
+
+
+# === Metrics registry (server.py) ===
+# Also folds in the events of cheese.py (`ingest`) and is the only one rotating `METRICS_LOG`
+class Metrics(EventLog):
+    def __init__(self, source):
+        super().__init__(source)
+        self._lock = threading.Lock()
+        self._ingest_lock = threading.Lock()
+        self._histograms = {} # (stage, result) -> [bucket counts, sum, count]
+        self._counters = {name: 0 for name in COUNTERS}
+        self._triggers = {} # photo -> time the trigger was heard
+        self._log_file = None
+        # Only events written after this process started are ingested
+        if os.path.exists(METRICS_LOG):
+            self._log_file = open(METRICS_LOG, "rb")
+            self._log_file.seek(0, os.SEEK_END)
+
+    def _record(self, event):
+        self._apply(event)
+        self._write(event)
+
+    def _apply(self, event):
+        with self._lock:
+            if event.get("type") == "span" and event.get("name") in STAGES:
+                key = (event["name"], event.get("result", "ok"))
+                histogram = self._histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+                for i, bound in enumerate(BUCKETS):
+                    if event["duration"] <= bound:
+                        histogram[0][i] += 1
+                        break
+                histogram[1] += event["duration"]
+                histogram[2] += 1
+            elif event.get("type") == "counter" and event.get("name") in COUNTERS:
+                self._counters[event["name"]] += event.get("value", 1)
+
+    def _add_trigger(self, event):
+        with self._lock:
+            self._triggers = {photo: ts for photo, ts in self._triggers.items() if event["ts"] - ts < TRIGGER_TTL}
+            self._triggers[event["photo"]] = event["ts"]
+
+    # Observe the time elapsed since the trigger of `photo` was heard, if known
+    def observe_since_trigger(self, stage, photo):
+        with self._lock:
+            triggered_at = self._triggers.pop(os.path.basename(photo), None)
+        if triggered_at is not None:
+            self.observe(stage, time.time() - triggered_at, photo)
+
+    def ingest(self):
+        with self._ingest_lock:
+            lines = self._read_new_lines()
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("source") == self.source:
+                continue
+            if event.get("type") == "mark":
+                if event.get("name") == "trigger" and event.get("photo"):
+                    self._add_trigger(event)
+            else:
+                self._apply(event)
+
+    def _read_complete_lines(self):
+        start = self._log_file.tell()
+        data = self._log_file.read()
+        # Leave a partially written last line for the next call
+        end = data.rfind(b"\n") + 1
+        self._log_file.seek(start + end)
+        return data[:end].decode().splitlines()
+
+    def _read_new_lines(self):
+        lines = []
+        try:
+            current_inode = os.stat(METRICS_LOG).st_ino
+        except FileNotFoundError:
+            current_inode = None
+
+        if self._log_file is not None:
+            if os.fstat(self._log_file.fileno()).st_size < self._log_file.tell(): # Log was truncated
+                self._log_file.seek(0)
+            lines += self._read_complete_lines()
+            if os.fstat(self._log_file.fileno()).st_ino != current_inode: # Log was rotated or deleted, old one is drained
+                self._log_file.close()
+                self._log_file = None
+
+        if self._log_file is None and current_inode is not None:
+            try:
+                self._log_file = open(METRICS_LOG, "rb")
+                lines += self._read_complete_lines()
+            except FileNotFoundError:
+                self._log_file = None
+
+        # Rotate once fully read, writers still holding the old file are drained on the next call
+        if self._log_file is not None and self._log_file.tell() > METRICS_LOG_MAX_BYTES:
+            try:
+                os.replace(METRICS_LOG, METRICS_LOG + ".1")
+            except OSError as e:
+                print(f"⚠️- Failed to rotate metrics log: {e}")
+        return lines
+
+    # Prometheus text format
+    def render(self):
+        out = []
+        with self._lock:
+            out.append("# HELP cheese_stage_duration_seconds Duration of each stage of a shot.")
+            out.append("# TYPE cheese_stage_duration_seconds histogram")
+            for stage in STAGES:
+                for result in RESULTS:
+                    if result != "ok" and (stage, result) not in self._histograms:
+                        continue
+                    buckets, total, count = self._histograms.get((stage, result), [[0] * len(BUCKETS), 0.0, 0])
+                    labels = f'stage="{stage}",result="{result}"'
+                    cumulative = 0
+                    for bound, bucket in zip(BUCKETS, buckets):
+                        cumulative += bucket
+                        out.append(f'cheese_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    out.append(f'cheese_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                    out.append(f'cheese_stage_duration_seconds_sum{{{labels}}} {total}')
+                    out.append(f'cheese_stage_duration_seconds_count{{{labels}}} {count}')
+            for name, help_text in COUNTERS.items():
+                out.append(f"# HELP cheese_{name}_total {help_text}.")
+                out.append(f"# TYPE cheese_{name}_total counter")
+                out.append(f"cheese_{name}_total {self._counters[name]}")
+        return "\n".join(out) + "\n"
@@ -5,12 +5,13 @@ from datetime import datetime
 from threading import Thread
 from queue import Queue
 
-from flask import Flask, send_from_directory, jsonify, render_template_string, request, abort
+from flask import Flask, Response, send_from_directory, jsonify, render_template_string, request, abort
 from flask_socketio import SocketIO
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from PIL import Image
 from flask_compress import Compress
+from metrics import Metrics
 
 # Configuration
 IMAGE_FOLDER = './photos'
@@ -30,6 +31,8 @@ Compress(app)
 
 stop_event = threading.Event()
 
+metrics = Metrics("server")
+
 image_event_queue = Queue()
 
 allowed_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif', '.webp'}
@@ -42,7 +45,7 @@ def generate_thumbnail(filename):
     thumb_path = os.path.join(THUMB_FOLDER, filename)
     if not os.path.exists(thumb_path):
         try:
-            with Image.open(source_path) as img:
+            with metrics.span("thumbnail", filename), Image.open(source_path) as img:
                 img.thumbnail(THUMB_SIZE)
                 img.save(thumb_path, quality=85, optimize=True)
                 print(f"Thumbnail created: {thumb_path}")
@@ -249,6 +252,11 @@ def image_page(filename):
     '''
     return render_template_string(html, filename=filename, mod_date=mod_date)
 
+@app.route('/metrics')
+def metrics_endpoint():
+    metrics.ingest()  # pick up the events written by cheese.py
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @socketio.on('message')
 def handle_message(data):
     print('received message: ' + str(data))
@@ -267,6 +275,8 @@ class ImageFolderHandler(FileSystemEventHandler):
                 generate_thumbnail(filename)  # generate thumbnail for new image immediately
                 image_event_queue.put('new_image')
                 self._last_emit = now
+            else:
+                metrics.incr('watchdog_events_dropped', event.src_path)
 
 def get_latest_image():
     images = list_images()
@@ -280,7 +290,10 @@ def background_emit_loop():
                 latest_image = get_latest_image()
                 if latest_image:
                     print("Emitting 'update' event with new image info")
-                    socketio.emit('update', {'image': latest_image}, namespace='/')
+                    with metrics.span('emit', latest_image['filename']):
+                        socketio.emit('update', {'image': latest_image}, namespace='/')
+                    metrics.ingest()  # needed to know when the trigger was heard
+                    metrics.observe_since_trigger('end_to_end', latest_image['filename'])
         except:
             socketio.sleep(0.1)
 